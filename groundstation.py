@@ -1,4 +1,6 @@
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
+import sys
 import time
 import subprocess
 import re
@@ -8,45 +10,158 @@ import adafruit_bme680
 import os
 import shutil
 import math
-from datetime import datetime
+import threading
+import queue
+import gzip
+import hashlib
+import shlex
+import socket
+import struct
+import fcntl
+import logging
+import atexit
+import signal
+
+# Optional: ctypes binding from LiFePO4wered-Pi (pip install lifepo4wered).
+# Reads the UPS registers in-process instead of forking lifepo4wered-cli.
+try:
+    import lifepo4wered
+except ImportError:
+    lifepo4wered = None
+
+# Optional: C JSON encoder for the 1 Hz telemetry responses (pip install orjson).
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------- BME680 SETUP ----------
+class GasGatedBME680(adafruit_bme680.Adafruit_BME680_I2C):
+    """
+    The stock driver turns the gas heater on for every forced measurement,
+    so each T/H/P read waits out the heater. With want_gas False the
+    CTRL_GAS_1 write is replaced by 0 (run_gas off) and the read returns
+    as soon as T/H/P are converted.
+    """
+    _REG_CTRL_GAS_1 = 0x71
+    want_gas = True
+
+    def _write(self, register, values):
+        if register == self._REG_CTRL_GAS_1 and not self.want_gas:
+            values = [0x00]
+        super()._write(register, values)
+
+
 i2c = busio.I2C(board.SCL, board.SDA)
-bme = adafruit_bme680.Adafruit_BME680_I2C(i2c, address=0x77)
+bme = GasGatedBME680(i2c, address=0x77)
+# Shorter heater pulse than the driver's 150 ms default, and a light IIR
+# filter so T/P don't need oversampling to stay smooth at 1 Hz.
+if hasattr(bme, "set_gas_heater"):
+    bme.set_gas_heater(320, 100)
+bme.filter_size = 3
 
 # ---------- LOGGING — YOUR REAL PATH ----------
 LOG_DIR = "/home/drone/GIT/groundstation/flight_logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 current_log_file = None
-current_log_handle = None
+current_log_fd = None  # raw O_APPEND fd: one write() per row, no flush step
+# Held while reading or swapping the log fd/path or enqueuing rows for it,
+# so a row can never be queued behind its file's close marker. Only the
+# log-writer thread ever writes to or closes an fd once it is published.
+_log_lock = threading.Lock()
 
 # ---------- SHELL CWD (for /api/run_command, if you still want it) ----------
 current_cwd = os.path.expanduser("~")
+_cwd_lock = threading.Lock()
 
 # ---------- BATTERY CONFIG / HELPERS ----------
 VBAT_MIN_DEFAULT = 2950  # mV, from lifepo4wered-cli get VBAT_MIN
 VBAT_MAX_DEFAULT = 3500  # mV, "full" voltage
 _vbat_min_cached = None
 
+# The UPS is polled by its own thread every BATT_POLL_S (battery voltage moves
+# slowly); telemetry samples just read the latest values.
+BATT_POLL_S = 3.0
+_battery_lock = threading.Lock()
+_battery_state = {"pct": None, "mv": None, "vin": None, "vout": None, "iout": None}
+
+# Resolved once so each spawn skips the PATH search. Telemetry helpers run
+# with a minimal env, no inherited fds to close, and no stdin/stderr pipes.
+LIFEPO4_CLI = shutil.which("lifepo4wered-cli") or "lifepo4wered-cli"
+_HELPER_SPAWN = {
+    "env": {"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C"},
+    "close_fds": False,
+    "stdin": subprocess.DEVNULL,
+    "stderr": subprocess.DEVNULL,
+}
+
+# first integer in lifepo4wered-cli output; matched on raw bytes (no decode)
+_INT_RE = re.compile(rb"(-?\d+)", re.ASCII)
+
+# ---------- SENSOR CACHE ----------
+SENSOR_CACHE_TTL = 0.5  # s, polls inside this window share one sensor read
+_sensor_lock = threading.Lock()
+_sensor_cache = {"t": 0.0, "bme": None, "bat": (None, None), "bat_ext": (None, None, None)}
+# Gas resistance drifts slowly; it is re-read on a longer TTL than T/H/P.
+GAS_TTL_S = 3.0
+_gas_cache = {"t": 0.0, "v": None}
+
 # ---------- GAS / AQI BASELINE ----------
 _gas_baseline = None  # first reading becomes baseline for AQI
 
 
 def parse_first_int(out):
-    m = re.search(r"(-?\d+)", out)
+    # Bare "3312\n" (what `get VBAT` prints): int() takes the bytes as-is.
+    try:
+        return int(out)
+    except ValueError:
+        pass
+    # "VBAT = 3312 mV": take the token after any '='.
+    tail = out.rpartition(b"=")[2] or out
+    try:
+        return int(tail.split(None, 1)[0])
+    except (ValueError, IndexError):
+        pass
+    # anchored match on the stripped tail before scanning the whole output
+    m = _INT_RE.match(tail.lstrip()) or _INT_RE.search(out)
     return int(m.group(1)) if m else None
 
 
 def lifepo4_get(param):
+    if lifepo4wered is not None:
+        try:
+            return int(lifepo4wered.read_lifepo4wered(getattr(lifepo4wered, param)))
+        except Exception:
+            pass  # fall back to the CLI below
+
     try:
-        out = subprocess.check_output(
-            ["lifepo4wered-cli", "get", param], text=True
-        ).strip()
+        out = subprocess.check_output([LIFEPO4_CLI, "get", param], **_HELPER_SPAWN)
         return parse_first_int(out)
     except Exception:
         return None
 
 
+def lifepo4_get_many(params):
+    """
+    {param: value} for several registers. Without the binding this is one
+    `lifepo4wered-cli get` (which dumps every "NAME = value") instead of a
+    fork per register; anything missing from the dump is asked for singly.
+    """
+    if lifepo4wered is not None:
+        return {p: lifepo4_get(p) for p in params}
+
+    values = {}
+    try:
+        out = subprocess.check_output([LIFEPO4_CLI, "get"], **_HELPER_SPAWN)
+        for line in out.splitlines():
+            name, sep, value = line.partition(b"=")
+            if sep:
+                values[name.strip().decode("ascii", "replace")] = parse_first_int(value)
+    except Exception:
+        pass
+    return {p: values[p] if values.get(p) is not None else lifepo4_get(p) for p in params}
+
+
 def get_vbat_min():
     """
     Try to get VBAT_MIN from the LiFePO4wered-Pi config once and cache it.
@@ -63,39 +178,79 @@ def get_vbat_min():
     return vmin
 
 
-def get_battery_percent():
+def _compute_pct(mv, vmin, vmax):
+    if mv <= vmin:
+        return 0
+    if mv >= vmax:
+        return 100
+    return int(round((mv - vmin) * 100.0 / (vmax - vmin)))
+
+
+def _build_pct_lut(vmin, vmax):
+    """Percent for every integer mV in [vmin, vmax]; callers clamp the index."""
+    return [_compute_pct(mv, vmin, vmax) for mv in range(vmin, vmax + 1)]
+
+
+_pct_lut = None  # built on first reading, once VBAT_MIN is known
+
+
+def battery_percent_from_mv(mv):
     """
     Linear 0–100% mapping from VBAT_MIN to 3500 mV.
     Below VBAT_MIN => 0%, above 3500 => 100%.
     """
-    mv = lifepo4_get("VBAT")
+    global _pct_lut
     if mv is None:
-        return None, None
+        return None
 
     vmin = get_vbat_min()
-    vmax = VBAT_MAX_DEFAULT
+    if _pct_lut is None:
+        _pct_lut = _build_pct_lut(vmin, max(vmin, VBAT_MAX_DEFAULT))
 
-    if mv <= vmin:
-        pct = 0
-    elif mv >= vmax:
-        pct = 100
-    else:
-        pct = int(round((mv - vmin) * 100.0 / (vmax - vmin)))
+    return _pct_lut[max(0, min(len(_pct_lut) - 1, mv - vmin))]
 
-    return pct, mv
 
-
-def get_battery_extended():
+def read_battery_block():
     """
-    Extra telemetry from LiFePO4wered-Pi(+):
+    One batched read of the LiFePO4wered-Pi(+):
+      - VBAT (battery voltage, mV) and its percentage
       - VIN  (input voltage, mV)
       - VOUT (5V rail voltage, mV)
       - IOUT (load current, mA)
+    Returns (pct, mv, vin_mv, vout_mv, load_current_ma).
     """
-    vin_mv = lifepo4_get("VIN")
-    vout_mv = lifepo4_get("VOUT")
-    load_current_ma = lifepo4_get("IOUT")
-    return vin_mv, vout_mv, load_current_ma
+    v = lifepo4_get_many(("VBAT", "VIN", "VOUT", "IOUT"))
+    mv = v["VBAT"]
+    return battery_percent_from_mv(mv), mv, v["VIN"], v["VOUT"], v["IOUT"]
+
+
+def _battery_loop():
+    while True:
+        try:
+            pct, mv, vin_mv, vout_mv, load_current_ma = read_battery_block()
+        except Exception as e:
+            print(f"Battery poll error: {e}")
+        else:
+            with _battery_lock:
+                _battery_state.update(
+                    pct=pct, mv=mv, vin=vin_mv, vout=vout_mv, iout=load_current_ma,
+                )
+        time.sleep(BATT_POLL_S)
+
+
+def get_battery_percent():
+    """Latest (pct, mv) from the battery thread; (None, None) until first read."""
+    with _battery_lock:
+        return _battery_state["pct"], _battery_state["mv"]
+
+
+def get_battery_extended():
+    """Latest (vin_mv, vout_mv, load_current_ma) from the battery thread."""
+    with _battery_lock:
+        return _battery_state["vin"], _battery_state["vout"], _battery_state["iout"]
+
+
+threading.Thread(target=_battery_loop, name="battery", daemon=True).start()
 
 
 def compute_dew_point_c(temp_c, rh):
@@ -113,6 +268,16 @@ def compute_dew_point_c(temp_c, rh):
     return dew
 
 
+def compute_altitude_m(pressure_hpa, sea_level_hpa):
+    """
+    Barometric altitude, same formula as the Adafruit driver's
+    `altitude` property but from the pressure we already read.
+    """
+    if pressure_hpa is None or not sea_level_hpa:
+        return None
+    return 44330.0 * (1.0 - (pressure_hpa / sea_level_hpa) ** 0.1903)
+
+
 def compute_fire_risk_index(temp_c, rh, dew_point_c):
     """
     Very simple heuristic fire risk index 0–100 based on:
@@ -190,15 +355,21 @@ def compute_air_quality_index(gas_ohms):
 
 
 def get_bme_readings():
-    temperature_c = float(bme.temperature)
-    humidity = float(bme.humidity)
-    pressure_hpa = float(bme.pressure)
-    gas_ohms = float(bme.gas)
-
-    try:
-        altitude_m = float(bme.altitude)
-    except AttributeError:
-        altitude_m = None
+    # The driver already returns numbers (gas is an int), no float() needed,
+    # and its properties share one forced measurement per refresh window;
+    # each property is still touched only once here.
+    now = time.monotonic()
+    gas_due = _gas_cache["v"] is None or now - _gas_cache["t"] >= GAS_TTL_S
+    bme.want_gas = gas_due  # heater only runs on measurements that need gas
+    temperature_c = bme.temperature
+    humidity = bme.humidity
+    pressure_hpa = bme.pressure
+    if gas_due:
+        _gas_cache["v"] = bme.gas
+        _gas_cache["t"] = now
+    gas_ohms = _gas_cache["v"]
+
+    altitude_m = compute_altitude_m(pressure_hpa, getattr(bme, "sea_level_pressure", None))
 
     dew_point_c = compute_dew_point_c(temperature_c, humidity)
     fire_risk_index, fire_risk_level = compute_fire_risk_index(
@@ -219,8 +390,36 @@ def get_bme_readings():
         "air_quality_level": air_quality_level,
     }
 
+
+def get_sensor_readings(max_age=SENSOR_CACHE_TTL):
+    """
+    BME680 + battery readings, reused while younger than max_age seconds
+    so back-to-back callers don't repeat the I²C / lifepo4wered work.
+    (The driver itself also shares one measurement across the T/H/P/gas
+    properties within its refresh_rate window.)
+    Returns (bme_data, (battery_pct, battery_mv), (vin_mv, vout_mv, load_current_ma)).
+    """
+    with _sensor_lock:
+        now = time.monotonic()
+        if _sensor_cache["bme"] is None or now - _sensor_cache["t"] >= max_age:
+            _sensor_cache["bme"] = get_bme_readings()
+            _sensor_cache["bat"] = get_battery_percent()
+            _sensor_cache["bat_ext"] = get_battery_extended()
+            _sensor_cache["t"] = now
+        return _sensor_cache["bme"], _sensor_cache["bat"], _sensor_cache["bat_ext"]
+
 # ---------- SYSTEM STATS (GROUND STATION) ----------
-def get_system_stats():
+# Two tiers: cheap /proc + sysfs reads refresh every STATS_TTL_S, a known IP
+# address (changes rarely) only every NET_TTL_S. A missing address (Wi-Fi
+# still coming up at boot) is re-read on every call until one appears.
+STATS_TTL_S = 5.0  # CPU temp, load, memory and disk move over seconds
+NET_TTL_S = 60.0
+_stats_lock = threading.Lock()
+_stats_cache = {"t": 0.0, "v": None}
+_net_cache = {"t": 0.0, "v": None}
+
+
+def read_local_stats():
     cpu_temp_c = None
     try:
         with open("/sys/class/thermal/thermal_zone0/temp") as f:
@@ -237,33 +436,27 @@ def get_system_stats():
     mem_total_kb = None
     mem_avail_kb = None
     try:
-        with open("/proc/meminfo") as f:
-            for line in f:
-                if line.startswith("MemTotal:"):
-                    mem_total_kb = int(line.split()[1])
-                elif line.startswith("MemAvailable:"):
-                    mem_avail_kb = int(line.split()[1])
+        # both fields sit in the first few lines; slice them out of one read
+        with open("/proc/meminfo", "rb") as f:
+            data = f.read(256)
+        i = data.index(b"MemTotal:") + 9
+        mem_total_kb = int(data[i:data.index(b"kB", i)])
+        i = data.index(b"MemAvailable:") + 13
+        mem_avail_kb = int(data[i:data.index(b"kB", i)])
     except Exception:
         pass
 
     mem_total_mb = mem_used_mb = None
-    if mem_total_kb and mem_avail_kb:
+    if mem_total_kb is not None and mem_avail_kb is not None:
         mem_total_mb = mem_total_kb / 1024.0
         mem_used_mb = (mem_total_kb - mem_avail_kb) / 1024.0
 
     disk_free_gb = disk_used_pct = None
     try:
-        total, used, free = shutil.disk_usage(LOG_DIR)
-        disk_free_gb = free / (1024.0 ** 3)
-        disk_used_pct = used * 100.0 / total
-    except Exception:
-        pass
-
-    ip_address = None
-    try:
-        ip_out = subprocess.check_output(["hostname", "-I"], text=True).strip()
-        if ip_out:
-            ip_address = ip_out.split()[0]
+        # what shutil.disk_usage computes, straight from one statvfs()
+        st = os.statvfs(LOG_DIR)
+        disk_free_gb = st.f_bavail * st.f_frsize / (1024.0 ** 3)
+        disk_used_pct = (st.f_blocks - st.f_bfree) * 100.0 / st.f_blocks
     except Exception:
         pass
 
@@ -274,11 +467,431 @@ def get_system_stats():
         "mem_used_mb": mem_used_mb,
         "disk_free_gb": disk_free_gb,
         "disk_used_pct": disk_used_pct,
-        "ip_address": ip_address,
     }
 
+
+SIOCGIFADDR = 0x8915
+
+
+def read_ip_address():
+    """
+    First IPv4 address on a non-loopback interface, like `hostname -I`,
+    but asked of the kernel with SIOCGIFADDR instead of forking.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            for _, name in socket.if_nameindex():
+                if name == "lo":
+                    continue
+                try:
+                    req = struct.pack("256s", name.encode()[:15])
+                    return socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, req)[20:24])
+                except OSError:
+                    continue  # down, or no IPv4 address
+    except Exception:
+        pass
+    return None
+
+
+def get_system_stats():
+    """Local stats plus ip_address, each tier re-read only when its TTL expires."""
+    with _stats_lock:
+        now = time.monotonic()
+        if _net_cache["v"] is None or now - _net_cache["t"] >= NET_TTL_S:
+            _net_cache["v"] = read_ip_address()
+            _net_cache["t"] = now
+        if _stats_cache["v"] is None or now - _stats_cache["t"] >= STATS_TTL_S:
+            _stats_cache["v"] = dict(read_local_stats(), ip_address=_net_cache["v"])
+            _stats_cache["t"] = now
+        elif _stats_cache["v"]["ip_address"] != _net_cache["v"]:
+            _stats_cache["v"] = dict(_stats_cache["v"], ip_address=_net_cache["v"])
+        return _stats_cache["v"]
+
+# ---------- FLIGHT LOG WRITER ----------
+# The sampler only enqueues rows; one daemon thread formats them and writes
+# every LOG_FLUSH_S (or once LOG_BUFFER_BYTES are pending), so a 1 Hz log
+# costs one write() every couple of seconds instead of one per row.
+# Items are (fd, row_args), (fd, None) to close fd after its pending rows.
+# Each file is fsync'd every LOG_FSYNC_S and when it is closed, so a power
+# cut loses at most that much of the mission.
+LOG_FLUSH_S = 2.0
+LOG_BUFFER_BYTES = 8192
+LOG_FSYNC_S = 30.0
+LOG_CLOSE_WAIT_S = 5.0  # shutdown gives up on the writer after this long
+_log_q = queue.Queue(maxsize=10000)
+
+
+_iso_cache = {"s": None, "v": b""}  # writer thread only
+
+
+def _iso_seconds(secs):
+    """Local ISO-8601 time to the second (bytes), re-formatted only when the second changes."""
+    if secs != _iso_cache["s"]:
+        _iso_cache["s"] = secs
+        _iso_cache["v"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(secs)).encode()
+    return _iso_cache["v"]
+
+
+# Rows are built directly as bytes with C-level %-formatting (no str -> encode).
+_ROW_FMT = b"%s,%d.%03d,%.2f,%.1f,%.2f,%.0f,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n"
+# Fast path for the usual case where every optional field is present: one
+# %-format with no per-field None checks.
+_ROW_FMT_FULL = b"%s,%d.%03d,%.2f,%.1f,%.2f,%.0f,%d,%d,%.2f,%.2f,%d,%d,%d,%.1f,%s,%d,%s\n"
+_level_bytes = {}  # risk/AQI labels are a handful of fixed strings
+
+
+def _opt(v, fmt=b"%d"):
+    return b"" if v is None else fmt % v
+
+
+def _opt_str(v):
+    if v is None:
+        return b""
+    e = _level_bytes.get(v)
+    if e is None:
+        e = _level_bytes[v] = v.encode()
+    return e
+
+
+def format_log_row(now_ns, bme_data, battery_pct, battery_mv,
+                   vin_mv, vout_mv, load_current_ma):
+    b = bme_data
+    secs, ns = divmod(now_ns, 1_000_000_000)
+    dew, alt = b["dew_point_c"], b["altitude_m"]
+    fire, aqi = b["fire_risk_index"], b["air_quality_index"]
+    if None not in (battery_pct, battery_mv, dew, alt, vin_mv, vout_mv,
+                    load_current_ma, fire, aqi):
+        return _ROW_FMT_FULL % (
+            _iso_seconds(secs), secs, ns // 1_000_000,
+            b["temperature_c"], b["humidity"], b["pressure_hpa"], b["gas_ohms"],
+            battery_pct, battery_mv, dew, alt, vin_mv, vout_mv, load_current_ma,
+            fire, _opt_str(b["fire_risk_level"]), aqi, _opt_str(b["air_quality_level"]),
+        )
+    return _ROW_FMT % (
+        _iso_seconds(secs), secs, ns // 1_000_000,
+        b["temperature_c"], b["humidity"], b["pressure_hpa"], b["gas_ohms"],
+        _opt(battery_pct), _opt(battery_mv),
+        _opt(dew, b"%.2f"), _opt(alt, b"%.2f"),
+        _opt(vin_mv), _opt(vout_mv), _opt(load_current_ma),
+        _opt(fire, b"%.1f"), _opt_str(b["fire_risk_level"]),
+        _opt(aqi), _opt_str(b["air_quality_level"]),
+    )
+
+
+def _log_writer():
+    pending = {}  # fd -> encoded rows not yet written
+    synced = {}  # fd -> monotonic time of its last fsync
+    size = 0
+    deadline = None  # flush time for the oldest pending row
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            fd, row = _log_q.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        else:
+            try:
+                if row is None:
+                    chunks = pending.pop(fd, [])
+                    size -= sum(map(len, chunks))
+                    _write_chunks(fd, chunks)
+                    _fsync(fd)
+                    synced.pop(fd, None)
+                    os.close(fd)
+                else:
+                    line = format_log_row(*row)
+                    pending.setdefault(fd, []).append(line)
+                    size += len(line)
+                    if deadline is None:
+                        deadline = time.monotonic() + LOG_FLUSH_S
+            except Exception as e:
+                print(f"Log writer error: {e}")
+            finally:
+                _log_q.task_done()
+
+        if pending and (size >= LOG_BUFFER_BYTES or time.monotonic() >= deadline):
+            now = time.monotonic()
+            for fd, chunks in pending.items():
+                _write_chunks(fd, chunks)
+                if now - synced.setdefault(fd, now) >= LOG_FSYNC_S:
+                    _fsync(fd)
+                    synced[fd] = now
+            pending.clear()
+            size = 0
+        if not pending:
+            deadline = None
+
+
+def _write_chunks(fd, chunks):
+    if not chunks:
+        return
+    try:
+        os.write(fd, b"".join(chunks))
+    except OSError as e:
+        print(f"Log write failed: {e}")
+
+
+def _fsync(fd):
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        print(f"Log fsync failed: {e}")
+
+
+threading.Thread(target=_log_writer, name="log-writer", daemon=True).start()
+
+
+def close_current_log(wait=False):
+    """
+    Detach the open log, if any, and queue it for the writer to flush,
+    fsync and close. With wait=True, block until that has happened or
+    LOG_CLOSE_WAIT_S has passed.
+    Returns the log's path, or None if nothing was open.
+    """
+    global current_log_fd
+    with _log_lock:
+        fd, current_log_fd = current_log_fd, None
+        if fd is None:
+            return None
+        _log_q.put((fd, None))  # writer closes it after queued rows
+        filepath = current_log_file
+    if wait:
+        # not a bare join(): a stuck writer must not hang shutdown until SIGKILL
+        deadline = time.monotonic() + LOG_CLOSE_WAIT_S
+        while _log_q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+    return filepath
+
+
+# Don't lose the last buffered rows when the service is stopped mid-mission.
+atexit.register(close_current_log, wait=True)
+
+# ---------- TELEMETRY JSON ----------
+# The telemetry payload has a fixed schema, so it is formatted directly
+# instead of going through a dict + JSON encoder on every sample.
+
+def _jnum(v, spec):
+    # NaN/inf would format as "nan"/"inf", which is not JSON; orjson's rule
+    if v is None or not math.isfinite(v):
+        return "null"
+    return format(v, spec)
+
+
+def _jstr(v):
+    # only ever short ASCII here (risk/AQI levels, IP address)
+    return "null" if v is None else '"' + v + '"'
+
+
+def telemetry_fields(bme_data, battery, battery_ext, sys_stats, now_ns):
+    """
+    Fixed-order ((key, JSON-encoded value), ...) for one sample. Each value
+    carries only the precision the dashboard shows, which keeps the body
+    small and makes unchanged fields drop out of the SSE deltas.
+    """
+    battery_pct, battery_mv = battery
+    vin_mv, vout_mv, load_current_ma = battery_ext
+    return (
+        ("temperature_c", _jnum(bme_data["temperature_c"], ".2f")),
+        ("humidity", _jnum(bme_data["humidity"], ".1f")),
+        ("pressure_hpa", _jnum(bme_data["pressure_hpa"], ".1f")),
+        ("gas_ohms", _jnum(bme_data["gas_ohms"], ".0f")),
+        ("dew_point_c", _jnum(bme_data["dew_point_c"], ".1f")),
+        ("altitude_m", _jnum(bme_data["altitude_m"], ".1f")),
+        ("fire_risk_index", _jnum(bme_data["fire_risk_index"], ".0f")),
+        ("fire_risk_level", _jstr(bme_data["fire_risk_level"])),
+        ("air_quality_index", _jnum(bme_data["air_quality_index"], "d")),
+        ("air_quality_level", _jstr(bme_data["air_quality_level"])),
+        ("battery_percent", _jnum(battery_pct, "d")),
+        ("battery_mv", _jnum(battery_mv, "d")),
+        ("vin_mv", _jnum(vin_mv, "d")),
+        ("vout_mv", _jnum(vout_mv, "d")),
+        ("load_current_ma", _jnum(load_current_ma, "d")),
+        ("timestamp_ns", str(now_ns)),
+        ("cpu_temp_c", _jnum(sys_stats["cpu_temp_c"], ".1f")),
+        ("load_1m", _jnum(sys_stats["load_1m"], ".2f")),
+        ("mem_total_mb", _jnum(sys_stats["mem_total_mb"], ".0f")),
+        ("mem_used_mb", _jnum(sys_stats["mem_used_mb"], ".0f")),
+        ("disk_free_gb", _jnum(sys_stats["disk_free_gb"], ".1f")),
+        ("disk_used_pct", _jnum(sys_stats["disk_used_pct"], ".0f")),
+        ("ip_address", _jstr(sys_stats["ip_address"])),
+    )
+
+
+def fields_json(fields):
+    """UTF-8 JSON object bytes, ready to be used as a response body."""
+    return ("{" + ",".join(f'"{k}":{v}' for k, v in fields) + "}").encode()
+
+
+def fields_delta(fields, prev):
+    """Fields whose encoded value differs from prev (timestamp_ns always does)."""
+    if prev is None:
+        return fields
+    return tuple(f for f, p in zip(fields, prev) if f[1] != p[1])
+
+
+def sample_telemetry(max_age=SENSOR_CACHE_TTL):
+    """Read everything once; returns (telemetry fields, flight-log row args)."""
+    bme_data, battery, battery_ext = get_sensor_readings(max_age)
+    sys_stats = get_system_stats()
+    now_ns = time.time_ns()  # integer clock: no float formatting downstream
+    fields = telemetry_fields(bme_data, battery, battery_ext, sys_stats, now_ns)
+    return fields, (now_ns, bme_data) + battery + battery_ext
+
+# ---------- TELEMETRY SAMPLER ----------
+# One thread samples at SAMPLE_INTERVAL_S and every route reads its snapshot
+# (SSE stream and /api/telemetry alike), so sensor I/O no longer scales with
+# the number of clients. It is also the only producer of flight-log rows.
+SAMPLE_INTERVAL_S = 1.0
+_sample_cond = threading.Condition()
+# body: full JSON bytes. full_event / delta_event: the SSE frames for the full
+# object and for the fields that changed since seq - 1, encoded once per
+# sample and shared by every stream.
+_latest_sample = {"seq": 0, "body": None, "full_event": None, "delta_event": None,
+                  "fields": None, "t": 0.0}
+
+
+def _sampler():
+    while True:
+        started = time.monotonic()
+        try:
+            fields, row = sample_telemetry()
+        except Exception as e:
+            print(f"Sampler error: {e}")
+        else:
+            with _log_lock:
+                if current_log_fd is not None:
+                    try:
+                        _log_q.put_nowait((current_log_fd, row))
+                    except queue.Full:
+                        print("Log queue full, dropping sample")
+            body = fields_json(fields)
+            delta = fields_json(fields_delta(fields, _latest_sample["fields"]))
+            with _sample_cond:
+                _latest_sample["seq"] += 1
+                _latest_sample["body"] = body
+                _latest_sample["full_event"] = b"data: %s\n\n" % body
+                _latest_sample["delta_event"] = b"data: %s\n\n" % delta
+                _latest_sample["fields"] = fields
+                _latest_sample["t"] = time.monotonic()
+                _sample_cond.notify_all()
+        time.sleep(max(0.0, SAMPLE_INTERVAL_S - (time.monotonic() - started)))
+
+
+threading.Thread(target=_sampler, name="sampler", daemon=True).start()
+
+# ---------- SHELL COMMANDS ----------
+# Plain commands are exec'd directly (no /bin/sh in between); anything using
+# shell syntax still goes through the shell. Output is read incrementally
+# and capped so e.g. `find /` can't exhaust memory. At most RUN_MAX_INFLIGHT
+# commands run at once; extra requests are turned away instead of tying up
+# server threads that SSE viewers and telemetry need.
+RUN_TIMEOUT_S = 15
+RUN_OUTPUT_MAX = 64 * 1024  # chars; more than the terminal pane is useful for
+RUN_MAX_INFLIGHT = 2
+_run_slots = threading.BoundedSemaphore(RUN_MAX_INFLIGHT)
+DANGEROUS_COMMANDS = (
+    "rm -rf", "rm -fr", "mkfs", "dd if=", ":(){", "sudo rm",
+    "shutdown", "halt", "mklabel"
+)
+# any run of whitespace counts as a space, so "rm  -rf" is caught too
+_DANGEROUS_RE = re.compile(
+    "|".join(re.escape(d).replace(r"\ ", r"\s+") for d in DANGEROUS_COMMANDS),
+    re.IGNORECASE,
+)
+_SHELL_META_RE = re.compile(r"[|&;<>()$`\\\"'*?\[\]{}~#=%\n]")
+
+
+def run_shell_command(cmd, cwd):
+    """Returns (output, error)."""
+    args = None if _SHELL_META_RE.search(cmd) else shlex.split(cmd)
+    # exec directly only for a plain program found on PATH; builtins such as
+    # ulimit/umask/type and relative paths (resolved against cwd) need the shell
+    if args and "/" not in args[0] and shutil.which(args[0]):
+        shell = False
+    else:
+        args, shell = cmd, True
+
+    if not _run_slots.acquire(blocking=False):
+        return "Too many concurrent commands", True
+    try:
+        return _run_child(cmd, args, shell, cwd)
+    finally:
+        # _run_child only returns or raises once the child is reaped, so a
+        # slot is never freed while its process group is still running
+        _run_slots.release()
+
+
+def _run_child(cmd, args, shell, cwd):
+    p = subprocess.Popen(
+        args, shell=shell, cwd=cwd, text=True, errors="replace", bufsize=-1,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        start_new_session=True,  # own process group, so kill reaches pipelines
+    )
+    timed_out = []
+
+    def on_timeout():
+        timed_out.append(True)
+        _kill_group(p)
+
+    killer = threading.Timer(RUN_TIMEOUT_S, on_timeout)
+    killer.start()
+    chunks, total, truncated = [], 0, False
+    try:
+        for chunk in iter(lambda: p.stdout.read(8192), ""):
+            chunks.append(chunk)
+            total += len(chunk)
+            if total > RUN_OUTPUT_MAX:
+                truncated = True
+                _kill_group(p)
+                break
+        p.wait()
+    finally:
+        killer.cancel()
+        if p.poll() is None:  # bailed out early (e.g. read error): don't orphan it
+            _kill_group(p)
+            p.wait()
+        p.stdout.close()
+
+    output = "".join(chunks)[:RUN_OUTPUT_MAX]
+    if timed_out:
+        return output + f"\n[timed out after {RUN_TIMEOUT_S} seconds]", True
+    if truncated:
+        return output + f"\n[output truncated at {RUN_OUTPUT_MAX} characters]", False
+    if p.returncode != 0:
+        return output or f"Command '{cmd}' returned non-zero exit status {p.returncode}.", True
+    return output, False
+
+
+def _kill_group(p):
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except OSError:
+        pass  # already exited
+
 # ---------- FLASK APP ----------
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson; responses skip the str round-trip."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+else:
+    # stdlib fallback: no indentation (even in debug) and no key sorting
+    app.json.compact = True
+    app.json.sort_keys = False
+# No per-request access log line (the dev server would print one per poll)
+logging.getLogger("werkzeug").setLevel(logging.ERROR)
 
 INDEX_HTML = """<!doctype html>
 <html lang="en">
@@ -331,7 +944,7 @@ INDEX_HTML = """<!doctype html>
 
       <div class="card">
         <div class="card-title">Link</div>
-        <div class="sys-row">Latency: <span id="link-lat">--</span></div>
+        <div class="sys-row"><span id="link-lat-label">Latency</span>: <span id="link-lat">--</span></div>
         <div class="sys-row">Loss (30s): <span id="link-loss">--</span></div>
       </div>
 
@@ -435,19 +1048,61 @@ INDEX_HTML = """<!doctype html>
     const colorWarning = cssVars.getPropertyValue('--warning').trim() || '#f59e0b';
 
     const HISTORY_LEN = 120;
-    const batteryHistory = [];
-    const tempHistory = [];
+    // Fixed-size ring buffers: O(1) push, running min/max for autoscaling.
+    function makeHistory() {
+      return { buf: new Float32Array(HISTORY_LEN), head: 0, len: 0, min: Infinity, max: -Infinity };
+    }
+    const batteryHistory = makeHistory();
+    const tempHistory = makeHistory();
     const linkHistory = [];
     const MAX_LINK_SAMPLES = 30;
 
-    function pushHistory(arr, value) {
+    const nodeCache = {};
+    function el(id) {
+      return nodeCache[id] || (nodeCache[id] = document.getElementById(id));
+    }
+
+    function setText(node, text) {
+      if (node.textContent !== text) node.textContent = text;
+    }
+
+    // Live-log rows are recycled: once HISTORY_LEN exist, the oldest row is
+    // moved to the bottom and overwritten instead of parsing a new one.
+    const LIVE_LOG_COLS = 7;
+    function liveLogRow() {
+      const tbody = el('live-log-body');
+      if (tbody.rows.length >= HISTORY_LEN) {
+        return tbody.appendChild(tbody.rows[0]);
+      }
+      const tr = document.createElement('tr');
+      for (let i = 0; i < LIVE_LOG_COLS; i++) tr.appendChild(document.createElement('td'));
+      return tbody.appendChild(tr);
+    }
+
+    function pushHistory(hist, value) {
       if (value === null || value === undefined) return;
-      arr.push(value);
-      if (arr.length > HISTORY_LEN) arr.shift();
+      const evicted = hist.len === HISTORY_LEN ? hist.buf[hist.head] : null;
+      hist.buf[hist.head] = value;
+      value = hist.buf[hist.head];  // float32-rounded, so extremes compare exactly
+      hist.head = (hist.head + 1) % HISTORY_LEN;
+      if (hist.len < HISTORY_LEN) hist.len++;
+      if (evicted !== null && (evicted === hist.min || evicted === hist.max)) {
+        // the old extreme fell out of the window: rescan (rare)
+        hist.min = Infinity;
+        hist.max = -Infinity;
+        for (let i = 0; i < hist.len; i++) {
+          const v = hist.buf[i];
+          if (v < hist.min) hist.min = v;
+          if (v > hist.max) hist.max = v;
+        }
+      } else {
+        if (value < hist.min) hist.min = value;
+        if (value > hist.max) hist.max = value;
+      }
     }
 
-    function drawSparkline(canvasId, data, color, fixedMin = null, fixedMax = null) {
-      const canvas = document.getElementById(canvasId);
+    function drawSparkline(canvasId, hist, color, fixedMin = null, fixedMax = null) {
+      const canvas = el(canvasId);
       if (!canvas) return;
       const ctx = canvas.getContext('2d');
       const w = canvas.width;
@@ -455,7 +1110,8 @@ INDEX_HTML = """<!doctype html>
 
       ctx.clearRect(0, 0, w, h);
 
-      if (!data || data.length < 2) {
+      const n = hist.len;
+      if (n < 2) {
         ctx.strokeStyle = colorMuted;
         ctx.beginPath();
         ctx.moveTo(0, h - 1);
@@ -464,8 +1120,8 @@ INDEX_HTML = """<!doctype html>
         return;
       }
 
-      let min = fixedMin !== null ? fixedMin : Math.min.apply(null, data);
-      let max = fixedMax !== null ? fixedMax : Math.max.apply(null, data);
+      let min = fixedMin !== null ? fixedMin : hist.min;
+      let max = fixedMax !== null ? fixedMax : hist.max;
       if (min === max) {
         min -= 1;
         max += 1;
@@ -475,7 +1131,7 @@ INDEX_HTML = """<!doctype html>
       const paddingY = 3;
       const innerW = w - paddingX * 2;
       const innerH = h - paddingY * 2;
-      const stepX = innerW / (data.length - 1);
+      const stepX = innerW / (n - 1);
 
       ctx.strokeStyle = colorMuted;
       ctx.beginPath();
@@ -485,13 +1141,14 @@ INDEX_HTML = """<!doctype html>
 
       ctx.strokeStyle = color;
       ctx.beginPath();
-      data.forEach((v, i) => {
+      const range = max - min;
+      const start = hist.head - n + HISTORY_LEN;  // oldest sample
+      for (let i = 0; i < n; i++) {
         const x = paddingX + i * stepX;
-        const norm = (v - min) / (max - min);
-        const y = paddingY + (1 - norm) * innerH;
+        const y = paddingY + (1 - (hist.buf[(start + i) % HISTORY_LEN] - min) / range) * innerH;
         if (i === 0) ctx.moveTo(x, y);
         else ctx.lineTo(x, y);
-      });
+      }
       ctx.stroke();
     }
 
@@ -500,21 +1157,21 @@ INDEX_HTML = """<!doctype html>
       if (linkHistory.length > MAX_LINK_SAMPLES) linkHistory.shift();
       const total = linkHistory.length;
       if (total === 0) {
-        document.getElementById('link-loss').textContent = '--';
+        el('link-loss').textContent = '--';
         return;
       }
       const good = linkHistory.filter(x => x.ok).length;
       const lossPct = 100 * (total - good) / total;
-      document.getElementById('link-loss').textContent = lossPct.toFixed(0) + '%';
+      el('link-loss').textContent = lossPct.toFixed(0) + '%';
     }
 
-    setInterval(() => {
+    function updateClocks() {
       const n = new Date();
-      document.getElementById('utc').textContent   = n.toISOString().substr(11, 8);
-      document.getElementById('local').textContent = n.toTimeString().substr(0, 8);
-    }, 500);
+      setText(el('utc'),   n.toISOString().substr(11, 8));
+      setText(el('local'), n.toTimeString().substr(0, 8));
+    }
 
-    setInterval(() => {
+    function updateTimer() {
       let s = elapsedSeconds;
       if (missionStart) {
         s += Math.floor((Date.now() - missionStart) / 1000);
@@ -522,13 +1179,57 @@ INDEX_HTML = """<!doctype html>
       const h = String(Math.floor(s / 3600)).padStart(2, '0');
       const m = String(Math.floor((s % 3600) / 60)).padStart(2, '0');
       const sec = String(s % 60).padStart(2, '0');
-      document.getElementById('timer').textContent = `${h}:${m}:${sec}`;
-    }, 500);
+      setText(el('timer'), `${h}:${m}:${sec}`);
+    }
 
-    document.getElementById('logBtn').onclick = async () => {
-      const b = document.getElementById('logBtn');
-      const i = document.getElementById('recIndicator');
-      const logInfo = document.getElementById('log-info');
+    function checkStale() {
+      if (lastUpdate && Date.now() - lastUpdate > 5000) {
+        const s = el('status');
+        if (!s.textContent.includes('stale')) {
+          s.textContent += ' • Telemetry stale';
+        }
+      }
+    }
+
+    // Charts are redrawn at most once per frame, and only while visible
+    // (requestAnimationFrame doesn't run for hidden tabs).
+    let chartsDirty = false;
+    function drawCharts() {
+      chartsDirty = false;
+      drawSparkline('batteryChart', batteryHistory, colorPrimary, 0, 100);
+      drawSparkline('tempChart',    tempHistory,    colorGreen,  null, null);
+    }
+
+    // Scrolling the live log reads scrollHeight, which forces a layout;
+    // it is done once per frame here instead of right after the row write.
+    let logScrollDirty = false;
+
+    // One frame-aligned loop: charts and live-log scroll when dirty, and a
+    // ~2 Hz tick for clocks, timer and the stale watchdog.
+    let lastTick = 0;
+    function tick(t) {
+      if (chartsDirty && document.visibilityState === 'visible') {
+        drawCharts();
+      }
+      if (logScrollDirty) {
+        logScrollDirty = false;
+        const container = el('live-log-container');
+        container.scrollTop = container.scrollHeight;
+      }
+      if (t - lastTick >= 480) {
+        lastTick = t;
+        updateClocks();
+        updateTimer();
+        checkStale();
+      }
+      requestAnimationFrame(tick);
+    }
+    requestAnimationFrame(tick);
+
+    el('logBtn').onclick = async () => {
+      const b = el('logBtn');
+      const i = el('recIndicator');
+      const logInfo = el('log-info');
 
       if (!logging) {
         const now = new Date();
@@ -585,184 +1286,230 @@ INDEX_HTML = """<!doctype html>
       }
     };
 
-    async function upd() {
-      const start = performance.now();
-      try {
-        const r = await fetch('/api/telemetry');
-        const d = await r.json();
+    function render(d) {
+      lastUpdate = Date.now();
 
-        const latency = performance.now() - start;
-        document.getElementById('link-lat').textContent = latency.toFixed(0) + ' ms';
-        recordLink(true);
+      // sensor fields are null when the reading was missing or NaN
+      el('temp').textContent  = d.temperature_c != null ? d.temperature_c.toFixed(1) : '--';
+      el('hum').textContent   = d.humidity != null ? d.humidity.toFixed(1) : '--';
+      el('press').textContent = d.pressure_hpa != null ? d.pressure_hpa.toFixed(1) : '--';
+      el('gas').textContent   = d.gas_ohms != null ? Math.round(d.gas_ohms).toLocaleString() : '--';
 
-        lastUpdate = Date.now();
+      if (d.dew_point_c != null) {
+        el('dew').textContent = d.dew_point_c.toFixed(1);
+      } else {
+        el('dew').textContent = '--';
+      }
 
-        document.getElementById('temp').textContent  = d.temperature_c.toFixed(1);
-        document.getElementById('hum').textContent   = d.humidity.toFixed(1);
-        document.getElementById('press').textContent = d.pressure_hpa.toFixed(1);
-        document.getElementById('gas').textContent   = Math.round(d.gas_ohms).toLocaleString();
+      if (d.altitude_m != null) {
+        el('alt').textContent = d.altitude_m.toFixed(1);
+      } else {
+        el('alt').textContent = '--';
+      }
 
-        if (d.dew_point_c != null) {
-          document.getElementById('dew').textContent = d.dew_point_c.toFixed(1);
-        } else {
-          document.getElementById('dew').textContent = '--';
-        }
+      if (d.fire_risk_index != null) {
+        el('fire-risk').textContent =
+          d.fire_risk_index.toFixed(0) + ' (' + d.fire_risk_level + ')';
+      } else {
+        el('fire-risk').textContent = '--';
+      }
 
-        if (d.altitude_m != null) {
-          document.getElementById('alt').textContent = d.altitude_m.toFixed(1);
-        } else {
-          document.getElementById('alt').textContent = '--';
-        }
+      if (d.air_quality_index != null) {
+        el('aqi').textContent =
+          d.air_quality_index.toFixed(0) + ' (' + d.air_quality_level + ')';
+      } else {
+        el('aqi').textContent = '--';
+      }
 
-        if (d.fire_risk_index != null) {
-          document.getElementById('fire-risk').textContent =
-            d.fire_risk_index.toFixed(0) + ' (' + d.fire_risk_level + ')';
-        } else {
-          document.getElementById('fire-risk').textContent = '--';
+      if (d.battery_percent != null) {
+        const pct  = d.battery_percent;
+        const fill = el('battery_fill');
+        const val  = el('battery');
+
+        val.textContent = pct;
+        el('battery_raw').textContent =
+          (d.battery_mv != null ? d.battery_mv + ' mV' : '');
+
+        let currentLine = '';
+        if (d.load_current_ma != null) {
+          currentLine = d.load_current_ma + ' mA load';
         }
+        el('battery_current').textContent = currentLine;
 
-        if (d.air_quality_index != null) {
-          document.getElementById('aqi').textContent =
-            d.air_quality_index.toFixed(0) + ' (' + d.air_quality_level + ')';
-        } else {
-          document.getElementById('aqi').textContent = '--';
+        let voutLine = '';
+        if (d.vout_mv != null) {
+          voutLine = 'Pi 5V rail: ' + d.vout_mv + ' mV';
         }
+        el('battery_vout').textContent = voutLine;
 
-        if (d.battery_percent !== null) {
-          const pct  = d.battery_percent;
-          const fill = document.getElementById('battery_fill');
-          const val  = document.getElementById('battery');
-
-          val.textContent = pct;
-          document.getElementById('battery_raw').textContent =
-            (d.battery_mv != null ? d.battery_mv + ' mV' : '');
-
-          let currentLine = '';
-          if (d.load_current_ma != null) {
-            currentLine = d.load_current_ma + ' mA load';
-          }
-          document.getElementById('battery_current').textContent = currentLine;
-
-          let voutLine = '';
-          if (d.vout_mv != null) {
-            voutLine = 'Pi 5V rail: ' + d.vout_mv + ' mV';
-          }
-          document.getElementById('battery_vout').textContent = voutLine;
-
-          let vinLine = '';
-          if (d.vin_mv != null) {
-            vinLine = 'Input: ' + d.vin_mv + ' mV';
-          }
-          document.getElementById('battery_vin').textContent = vinLine;
-
-          fill.style.width = pct + '%';
-
-          let color = colorPrimary;
-          if (pct <= 20)      color = colorDanger;
-          else if (pct <= 40) color = colorWarning;
-          fill.style.background = color;
-
-          pushHistory(batteryHistory, pct);
+        let vinLine = '';
+        if (d.vin_mv != null) {
+          vinLine = 'Input: ' + d.vin_mv + ' mV';
         }
+        el('battery_vin').textContent = vinLine;
 
-        pushHistory(tempHistory, d.temperature_c);
+        fill.style.width = pct + '%';
 
-        if (d.cpu_temp_c != null) {
-          document.getElementById('sys-cpu-temp').textContent = d.cpu_temp_c.toFixed(1) + '°C';
-        } else {
-          document.getElementById('sys-cpu-temp').textContent = '--';
-        }
+        let color = colorPrimary;
+        if (pct <= 20)      color = colorDanger;
+        else if (pct <= 40) color = colorWarning;
+        fill.style.background = color;
 
-        if (d.load_1m != null) {
-          document.getElementById('sys-load').textContent = d.load_1m.toFixed(2);
-        } else {
-          document.getElementById('sys-load').textContent = '--';
-        }
+        pushHistory(batteryHistory, pct);
+      }
 
-        if (d.mem_total_mb != null && d.mem_used_mb != null) {
-          document.getElementById('sys-ram').textContent =
-            d.mem_used_mb.toFixed(0) + ' / ' + d.mem_total_mb.toFixed(0) + ' MB';
-        } else {
-          document.getElementById('sys-ram').textContent = '--';
-        }
+      pushHistory(tempHistory, d.temperature_c);
 
-        if (d.disk_free_gb != null && d.disk_used_pct != null) {
-          document.getElementById('sys-disk').textContent =
-            d.disk_used_pct.toFixed(0) + '% • ' + d.disk_free_gb.toFixed(1) + ' GB free';
-        } else {
-          document.getElementById('sys-disk').textContent = '--';
-        }
+      if (d.cpu_temp_c != null) {
+        el('sys-cpu-temp').textContent = d.cpu_temp_c.toFixed(1) + '°C';
+      } else {
+        el('sys-cpu-temp').textContent = '--';
+      }
 
-        document.getElementById('net-ip').textContent = d.ip_address || '--';
+      if (d.load_1m != null) {
+        el('sys-load').textContent = d.load_1m.toFixed(2);
+      } else {
+        el('sys-load').textContent = '--';
+      }
 
-        let status = 'Telemetry OK';
-        if (d.battery_percent !== null && d.battery_percent <= 20) {
-          status += ' • LOW BATTERY';
-        }
+      if (d.mem_total_mb != null && d.mem_used_mb != null) {
+        el('sys-ram').textContent =
+          d.mem_used_mb.toFixed(0) + ' / ' + d.mem_total_mb.toFixed(0) + ' MB';
+      } else {
+        el('sys-ram').textContent = '--';
+      }
 
-        document.getElementById('status').textContent =
-          status + ' • ' + new Date(d.timestamp * 1000).toLocaleString().slice(0, 24);
-
-        drawSparkline('batteryChart', batteryHistory, colorPrimary, 0, 100);
-        drawSparkline('tempChart',    tempHistory,    colorGreen,  null, null);
-
-        if (logging) {
-          const tbody = document.getElementById('live-log-body');
-          const tr = document.createElement('tr');
-          const t = new Date(d.timestamp * 1000);
-          const timeStr = t.toISOString().slice(11, 19);
-
-          tr.innerHTML = `
-            <td>${timeStr}</td>
-            <td>${d.temperature_c.toFixed(2)}</td>
-            <td>${d.humidity.toFixed(1)}</td>
-            <td>${d.pressure_hpa.toFixed(1)}</td>
-            <td>${Math.round(d.gas_ohms)}</td>
-            <td>${d.battery_percent !== null ? d.battery_percent : ''}</td>
-            <td>${d.battery_mv !== null ? d.battery_mv : ''}</td>
-          `;
-          tbody.appendChild(tr);
-
-          while (tbody.rows.length > HISTORY_LEN) {
-            tbody.deleteRow(0);
-          }
-
-          const container = document.getElementById('live-log-container');
-          container.scrollTop = container.scrollHeight;
-        }
-      } catch (e) {
-        document.getElementById('status').textContent = 'Connection lost';
-        recordLink(false);
+      if (d.disk_free_gb != null && d.disk_used_pct != null) {
+        el('sys-disk').textContent =
+          d.disk_used_pct.toFixed(0) + '% • ' + d.disk_free_gb.toFixed(1) + ' GB free';
+      } else {
+        el('sys-disk').textContent = '--';
+      }
+
+      el('net-ip').textContent = d.ip_address || '--';
+
+      let status = 'Telemetry OK';
+      if (d.battery_percent != null && d.battery_percent <= 20) {
+        status += ' • LOW BATTERY';
+      }
+
+      el('status').textContent =
+        status + ' • ' + new Date(d.timestamp_ns / 1e6).toLocaleString().slice(0, 24);
+
+      chartsDirty = true;
+
+      if (logging) {
+        const cells = liveLogRow().cells;
+        const t = new Date(d.timestamp_ns / 1e6);
+        cells[0].textContent = t.toISOString().slice(11, 19);
+        cells[1].textContent = d.temperature_c != null ? d.temperature_c.toFixed(2) : '';
+        cells[2].textContent = d.humidity != null ? d.humidity.toFixed(1) : '';
+        cells[3].textContent = d.pressure_hpa != null ? d.pressure_hpa.toFixed(1) : '';
+        cells[4].textContent = d.gas_ohms != null ? Math.round(d.gas_ohms) : '';
+        cells[5].textContent = d.battery_percent != null ? d.battery_percent : '';
+        cells[6].textContent = d.battery_mv != null ? d.battery_mv : '';
+
+        logScrollDirty = true;
       }
     }
 
-    setInterval(upd, 1000);
-    upd();
+    function linkLost() {
+      el('status').textContent = 'Connection lost';
+      recordLink(false);
+    }
 
-    setInterval(() => {
-      if (lastUpdate && Date.now() - lastUpdate > 5000) {
-        const s = document.getElementById('status');
-        if (!s.textContent.includes('Stale')) {
-          s.textContent += ' • Telemetry stale';
-        }
+    async function upd() {
+      const start = performance.now();
+      try {
+        const r = await fetch('/api/telemetry');
+        const d = await r.json();
+
+        const latency = performance.now() - start;
+        el('link-lat').textContent = latency.toFixed(0) + ' ms';
+        recordLink(true);
+        render(d);
+      } catch (e) {
+        linkLost();
       }
-    }, 2000);
+    }
+
+    // Nothing needs to reach a hidden tab (the flight log is written on the
+    // Pi), so the stream is closed and polling paused while hidden.
+    const visible = () => document.visibilityState === 'visible';
+
+    if (window.EventSource) {
+      // Server pushes one sample per second over a single connection.
+      // Events after the first carry only changed fields; merge them.
+      const state = {};
+      let es = null;
+
+      // There is no request round trip to time here, and the Pi's clock
+      // (no RTC, often no NTP) can't be compared with ours directly. So show
+      // each event's delay relative to the fastest one seen recently: the
+      // clock offset cancels out. The baseline is renewed every 60 events
+      // so a clock step on the Pi doesn't skew it for good.
+      el('link-lat-label').textContent = 'Delay';
+      let baseline = Infinity;
+      let windowMin = Infinity;
+      let windowCount = 0;
+      const showDelay = tsNs => {
+        const offset = Date.now() - tsNs / 1e6;
+        windowMin = Math.min(windowMin, offset);
+        if (++windowCount >= 60) {
+          baseline = windowMin;
+          windowMin = Infinity;
+          windowCount = 0;
+        }
+        const delay = offset - Math.min(baseline, windowMin);
+        el('link-lat').textContent = '+' + delay.toFixed(0) + ' ms';
+      };
+
+      const openStream = () => {
+        es = new EventSource('/api/stream');
+        es.onmessage = e => {
+          const d = Object.assign(state, JSON.parse(e.data));
+          showDelay(d.timestamp_ns);
+          recordLink(true);
+          render(d);
+        };
+        es.onerror = linkLost;
+      };
+      openStream();
+      document.addEventListener('visibilitychange', () => {
+        if (visible()) {
+          if (!es) openStream();
+        } else if (es) {
+          es.close();
+          es = null;
+        }
+      });
+    } else {
+      let polling = false;
+      const poll = () => {
+        polling = visible();
+        if (polling) upd().finally(() => setTimeout(poll, 1000));
+      };
+      poll();
+      document.addEventListener('visibilitychange', () => {
+        if (visible() && !polling) poll();
+      });
+    }
 
     window.addEventListener('load', () => {
       const notes = localStorage.getItem('missionNotes');
       if (notes !== null) {
-        document.getElementById('mission-notes').value = notes;
+        el('mission-notes').value = notes;
       }
     });
 
-    document.getElementById('mission-notes').addEventListener('input', e => {
+    el('mission-notes').addEventListener('input', e => {
       localStorage.setItem('missionNotes', e.target.value);
     });
 
     window.addEventListener('keydown', e => {
       const tag = e.target && e.target.tagName;
       if (e.key === 'l' && tag !== 'INPUT' && tag !== 'TEXTAREA') {
-        document.getElementById('logBtn').click();
+        el('logBtn').click();
       }
     });
 
@@ -775,43 +1522,87 @@ INDEX_HTML = """<!doctype html>
 </body>
 </html>"""
 
+
+def _minify_html(html):
+    """
+    Drop HTML comments, whole-line // comments, indentation and blank lines.
+    Newlines are kept, so the inline JS (ASI, trailing // comments) is unaffected.
+    """
+    html = re.sub(r"<!--.*?-->", "", html, flags=re.S)
+    lines = (line.strip() for line in html.splitlines())
+    return "\n".join(l for l in lines if l and not l.startswith("//"))
+
+
+# The page is static: minify, compress and hash it once at import.
+# mtime=0 keeps the gzip bytes stable across restarts. The two encodings get
+# distinct ETags; the plain one is only for clients without gzip support.
+# The prebuilt bytes are handed to the response as-is (no per-request copy),
+# and at ~5 KB gzipped a sendfile path through a temp file would not pay off.
+_INDEX_BYTES = _minify_html(INDEX_HTML).encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, compresslevel=9, mtime=0)
+_INDEX_ETAG = hashlib.sha1(_INDEX_BYTES).hexdigest()
+_INDEX_COMMON_HEADERS = {
+    "Content-Type": "text/html; charset=utf-8",
+    "Cache-Control": "public, max-age=3600",
+    "Vary": "Accept-Encoding",
+}
+_INDEX_VARIANTS = {
+    True: (_INDEX_GZ, _INDEX_ETAG + "-gz",
+           dict(_INDEX_COMMON_HEADERS, **{"Content-Encoding": "gzip", "ETag": f'"{_INDEX_ETAG}-gz"'})),
+    False: (_INDEX_BYTES, _INDEX_ETAG,
+            dict(_INDEX_COMMON_HEADERS, ETag=f'"{_INDEX_ETAG}"')),
+}
+# A 304 repeats the validators and Cache-Control so revalidating renews the
+# browser's copy for another max-age.
+_INDEX_304_HEADERS = {
+    gz: {k: v for k, v in headers.items() if k in ("ETag", "Cache-Control", "Vary")}
+    for gz, (_, _, headers) in _INDEX_VARIANTS.items()
+}
+
 # ---------- ROUTES ----------
 
 @app.route("/")
 def index():
-    return INDEX_HTML
+    gz = request.accept_encodings["gzip"] > 0  # honours "gzip;q=0"
+    body, etag, headers = _INDEX_VARIANTS[gz]
+    if request.if_none_match.contains_weak(etag):
+        return app.response_class(status=304, headers=_INDEX_304_HEADERS[gz])
+    return app.response_class(body, headers=headers)
 
 
 @app.route("/api/start_log", methods=["POST"])
 def start_log():
-    global current_log_file, current_log_handle
+    global current_log_file, current_log_fd
     data = request.get_json() or {}
     mission_note = (data.get("note") or "").replace("\n", " ")
     filename = (data.get("filename", "fire_mission") + "_" +
-                datetime.now().strftime("%Y%m%d_%H%M%S"))
+                time.strftime("%Y%m%d_%H%M%S"))
     filepath = os.path.join(LOG_DIR, filename + ".csv")
-    current_log_file = filepath
-    current_log_handle = open(filepath, "w")
+    header = ""
     if mission_note:
-        current_log_handle.write(f"# note: {mission_note}\n")
-    current_log_handle.write(
+        header += f"# note: {mission_note}\n"
+    header += (
         "timestamp_iso,timestamp_unix,temperature_c,humidity,pressure_hpa,"
         "gas_ohms,battery_percent,battery_mv,dew_point_c,altitude_m,"
         "input_voltage_mv,output_voltage_mv,load_current_ma,"
         "fire_risk_index,fire_risk_level,air_quality_index,air_quality_level\n"
     )
-    current_log_handle.flush()
+    fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.write(fd, header.encode())
+    with _log_lock:
+        if current_log_fd is not None:
+            _log_q.put((current_log_fd, None))  # restarted without a stop
+        current_log_file = filepath
+        current_log_fd = fd
     print(f"Logging → {filepath}")
     return jsonify(success=True, logfile=filepath)
 
 
 @app.route("/api/stop_log", methods=["POST"])
 def stop_log():
-    global current_log_file, current_log_handle
-    if current_log_handle:
-        current_log_handle.close()
-        current_log_handle = None
-        print(f"Log saved → {current_log_file}")
+    filepath = close_current_log()
+    if filepath is not None:
+        print(f"Log saved → {filepath}")
     return jsonify(success=True)
 
 
@@ -819,12 +1610,14 @@ def stop_log():
 def run_command():
     global current_cwd
     cmd = request.json.get("cmd", "")
+    with _cwd_lock:
+        cwd = current_cwd
 
     if cmd is None or cmd.strip() == "":
-        return jsonify(output="", error=False, cwd=current_cwd)
+        return jsonify(output="", error=False, cwd=cwd)
 
     if len(cmd) > 200:
-        return jsonify(output="Command too long", error=True, cwd=current_cwd)
+        return jsonify(output="Command too long", error=True, cwd=cwd)
 
     stripped = cmd.strip()
 
@@ -833,93 +1626,84 @@ def run_command():
         target = parts[1] if len(parts) > 1 else os.path.expanduser("~")
         try:
             if not os.path.isabs(target):
-                new_dir = os.path.abspath(os.path.join(current_cwd, target))
+                new_dir = os.path.abspath(os.path.join(cwd, target))
             else:
                 new_dir = target
-            current_cwd = new_dir
-            return jsonify(output="", error=False, cwd=current_cwd)
+            with _cwd_lock:
+                current_cwd = new_dir
+            return jsonify(output="", error=False, cwd=new_dir)
         except Exception as e:
-            return jsonify(output=str(e), error=True, cwd=current_cwd)
+            return jsonify(output=str(e), error=True, cwd=cwd)
 
-    dangerous = [
-        "rm -rf", "mkfs", "dd if=", ":(){", "sudo rm",
-        "shutdown", "halt", "mklabel"
-    ]
-    if any(d in cmd.lower() for d in dangerous):
-        if "reboot" not in cmd.lower():
-            return jsonify(output="Blocked: dangerous command", error=True, cwd=current_cwd)
+    if _DANGEROUS_RE.search(cmd) and "reboot" not in cmd.lower():
+        return jsonify(output="Blocked: dangerous command", error=True, cwd=cwd)
 
     try:
-        result = subprocess.check_output(
-            cmd, shell=True, text=True, timeout=15, cwd=current_cwd
-        )
-        return jsonify(output=result, error=False, cwd=current_cwd)
+        result, error = run_shell_command(cmd, cwd)
+        return jsonify(output=result, error=error, cwd=cwd)
     except Exception as e:
-        return jsonify(output=str(e), error=True, cwd=current_cwd)
+        return jsonify(output=str(e), error=True, cwd=cwd)
 
 
 @app.route("/api/telemetry")
 def telemetry():
-    bme_data = get_bme_readings()
-    battery_pct, battery_mv = get_battery_percent()
-    vin_mv, vout_mv, load_current_ma = get_battery_extended()
-    sys_stats = get_system_stats()
-    now_unix = time.time()
-
-    resp = jsonify(
-        temperature_c=bme_data["temperature_c"],
-        humidity=bme_data["humidity"],
-        pressure_hpa=bme_data["pressure_hpa"],
-        gas_ohms=bme_data["gas_ohms"],
-        dew_point_c=bme_data["dew_point_c"],
-        altitude_m=bme_data["altitude_m"],
-        fire_risk_index=bme_data["fire_risk_index"],
-        fire_risk_level=bme_data["fire_risk_level"],
-        air_quality_index=bme_data["air_quality_index"],
-        air_quality_level=bme_data["air_quality_level"],
-        battery_percent=battery_pct,
-        battery_mv=battery_mv,
-        vin_mv=vin_mv,
-        vout_mv=vout_mv,
-        load_current_ma=load_current_ma,
-        timestamp=now_unix,
-        **sys_stats
+    # Latest background sample. ?max_age=<s> asks for one no older than that,
+    # reading the sensors here if the snapshot (or sensor cache) is too old.
+    max_age = request.args.get("max_age", type=float)
+    with _sample_cond:
+        body, sampled_at = _latest_sample["body"], _latest_sample["t"]
+    if max_age is None:
+        if body is None:
+            body = fields_json(sample_telemetry()[0])
+    elif body is None or time.monotonic() - sampled_at > max_age:
+        body = fields_json(sample_telemetry(max(0.0, max_age))[0])
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/api/stream")
+def stream():
+    """
+    Server-Sent Events: push each background sample to the client. The first
+    event (and any after a missed sample) is the full object; the rest only
+    carry the fields that changed, which the page merges into its state.
+    """
+    def events():
+        yield b"retry: 2000\n\n"  # reconnect 2 s after the server goes away
+        seq = 0
+        while True:
+            with _sample_cond:
+                _sample_cond.wait_for(lambda: _latest_sample["seq"] != seq, timeout=15)
+                new_seq = _latest_sample["seq"]
+                full = _latest_sample["full_event"]
+                delta = _latest_sample["delta_event"]
+            if new_seq == seq or full is None:
+                yield b": keep-alive\n\n"
+                continue
+            yield delta if seq and new_seq == seq + 1 else full
+            seq = new_seq
+
+    return app.response_class(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    if current_log_handle:
-        ts_iso = datetime.now().isoformat(timespec="seconds")
-
-        def fmt(v, fmt_str="{:.3f}"):
-            if v is None:
-                return ""
-            if isinstance(v, float):
-                return fmt_str.format(v)
-            return str(v)
-
-        line = (
-            f"{ts_iso},"
-            f"{fmt(now_unix)},"
-            f"{fmt(bme_data['temperature_c'], '{:.2f}')},"
-            f"{fmt(bme_data['humidity'], '{:.1f}')},"
-            f"{fmt(bme_data['pressure_hpa'], '{:.2f}')},"
-            f"{fmt(bme_data['gas_ohms'], '{:.0f}')},"
-            f"{'' if battery_pct is None else battery_pct},"
-            f"{'' if battery_mv is None else battery_mv},"
-            f"{'' if bme_data['dew_point_c'] is None else format(bme_data['dew_point_c'], '.2f')},"
-            f"{'' if bme_data['altitude_m'] is None else format(bme_data['altitude_m'], '.2f')},"
-            f"{'' if vin_mv is None else vin_mv},"
-            f"{'' if vout_mv is None else vout_mv},"
-            f"{'' if load_current_ma is None else load_current_ma},"
-            f"{'' if bme_data['fire_risk_index'] is None else format(bme_data['fire_risk_index'], '.1f')},"
-            f"{'' if bme_data['fire_risk_level'] is None else bme_data['fire_risk_level']},"
-            f"{'' if bme_data['air_quality_index'] is None else bme_data['air_quality_index']},"
-            f"{'' if bme_data['air_quality_level'] is None else bme_data['air_quality_level']}\n"
-        )
-        current_log_handle.write(line)
-        current_log_handle.flush()
-
-    return resp
-
 # ---------- START SERVER ----------
+# Always a single process (it owns the I²C bus and the log file) with a
+# thread pool; every /api/stream viewer holds one thread. Run directly to
+# use waitress (falls back to Werkzeug's dev server), or under gunicorn:
+#   gunicorn -w 1 -k gthread --threads 8 --keep-alive 65 -b 0.0.0.0:5000 groundstation:app
+# (no --preload: the sampler/logger threads must start in the worker)
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    # systemd stops the service with SIGTERM; exit normally so atexit
+    # flushes the open flight log (gunicorn does this itself)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        from waitress import serve
+    except ImportError:
+        # HTTP/1.1 so the browser can reuse one connection for its polls
+        from werkzeug.serving import WSGIRequestHandler
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        app.run(host="0.0.0.0", port=5000, threaded=True)
+    else:
+        serve(app, host="0.0.0.0", port=5000, threads=8)